@@ -1,7 +1,12 @@
+import os
+import re
+import time
+
+import numpy as np
 import pandas as pd
 from binance.client import Client
 from binance.enums import *
-import talib # For moving average calculation
+from numba import njit
 
 # --- Step 1: Set up Binance API Client ---
 api_key = ''
@@ -9,191 +14,443 @@ api_secret = ''
 client = Client(api_key, api_secret)
 
 # --- Step 2: Fetch Historical Candlestick Data ---
-def get_historical_klines(symbol, interval, start_str):
+
+# Fetched candles are cached locally as Parquet files to avoid repeat API round-trips
+CACHE_DIR = 'kline_cache'
+CACHE_MAX_AGE = 60 * 60 # seconds before a cached fetch is refreshed
+
+def get_historical_klines(symbol, interval, start_str, cache_dir=CACHE_DIR, max_age=CACHE_MAX_AGE):
     """
-    Fetches historical candlestick data from the Binance API.
+    Fetches historical candlestick data from the Binance API, reusing a recent local copy if one exists.
     
     Args:
         symbol (str): The trading pair (e.g., 'POLUSDT').
         interval (str): The candlestick time frame (e.g., '1h' for 1 hour).
         start_str (str): The start date for the data (e.g., '1 Jan, 2024').
+        cache_dir (str): The directory for cached Parquet files, or None to disable caching.
+        max_age (float): How many seconds a cached file stays valid.
 
     Returns:
         pd.DataFrame: A DataFrame with the candlestick data.
     """
+    cache_path = None
+    if cache_dir is not None:
+        cache_key = re.sub(r'[^A-Za-z0-9]+', '_', f"{symbol}_{interval}_{start_str}")
+        cache_path = os.path.join(cache_dir, f"{cache_key}.parquet")
+        if os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < max_age:
+            print(f"Loading cached historical data for {symbol} from {cache_path}...")
+            try:
+                return pd.read_parquet(cache_path, engine='pyarrow')
+            except (ImportError, OSError, ValueError) as e:
+                # The cache is only an optimisation (it needs pyarrow); fall back to the API
+                print(f"Could not read cached data ({e}), fetching from Binance instead.")
+
     print(f"Fetching historical data for {symbol} from {start_str}...")
     klines = client.get_historical_klines(symbol, interval, start_str)
     
-    df = pd.DataFrame(klines, columns=['open_time', 'Open', 'High', 'Low', 'Close', 'Volume', 'close_time', 'quote_asset_volume', 'number_of_trades', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'])
-    
-    for col in ['Open', 'High', 'Low', 'Close', 'Volume']:
-        df[col] = pd.to_numeric(df[col])
-    
-    df['open_time'] = pd.to_datetime(df['open_time'], unit='ms')
-    df.set_index('open_time', inplace=True)
+    if not klines:
+        return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+
+    # Keep only open_time and OHLCV; the remaining kline fields are never used
+    arr = np.array([kline[:6] for kline in klines], dtype=object)
+    df = pd.DataFrame(arr[:, 1:].astype(np.float64),
+                      columns=['Open', 'High', 'Low', 'Close', 'Volume'],
+                      index=pd.to_datetime(arr[:, 0].astype(np.int64), unit='ms').rename('open_time'))
+
+    if cache_path is not None:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            df.to_parquet(cache_path, engine='pyarrow', compression='zstd')
+        except (ImportError, OSError, ValueError) as e:
+            print(f"Could not cache historical data ({e}); continuing without the cache.")
     
     print("Data fetched successfully.")
     return df
 
 # --- Step 3: Define the Candlestick Pattern Logic with Filters ---
 
-def check_engulfing_pattern(df, index):
+# Signal codes stored per candle
+NO_SIGNAL = 0
+BULLISH = 1
+BEARISH = -1
+
+@njit(cache=True)
+def rolling_mean(values, period):
+    """
+    Computes a simple moving average with a running sum (add the newest value, drop the oldest).
+    The additions happen in the same order as TA-Lib's SMA, so the results match it exactly.
+    Closes that land exactly on the average then fall on the same side of the trend filter.
+    
+    Args:
+        values (np.ndarray): The float64 series to average.
+        period (int): The number of values in each window.
+
+    Returns:
+        np.ndarray: The moving average, NaN until the first full window.
+    """
+    n = len(values)
+    out = np.full(n, np.nan)
+    if n < period:
+        return out
+
+    window_sum = 0.0
+    for i in range(period - 1):
+        window_sum += values[i]
+    for i in range(period - 1, n):
+        window_sum += values[i]
+        out[i] = window_sum / period
+        window_sum -= values[i - period + 1]
+    return out
+
+def check_engulfing_pattern(df, ma_period=20, volume_period=10):
     """
-    Checks for a bullish or bearish engulfing pattern with trend and volume confirmation.
+    Flags bullish and bearish engulfing patterns with trend and volume confirmation
+    for every candle in the DataFrame in a single vectorized pass.
     
     Args:
         df (pd.DataFrame): The candlestick data.
-        index (int): The index of the current candle to check.
+        ma_period (int): The look-back period of the trend moving average.
+        volume_period (int): The number of previous candles averaged for volume confirmation.
 
     Returns:
-        str: 'bullish' if a valid bullish signal is found, 'bearish' for a bearish signal,
-             otherwise returns None.
+        np.ndarray: An int8 signal per candle: BULLISH for a valid bullish signal, BEARISH
+                    for a valid bearish signal, otherwise NO_SIGNAL.
     """
-    if index < 20: 
-        return None
-        
-    current_candle = df.iloc[index]
-    previous_candle = df.iloc[index - 1]
+    o = df['Open'].to_numpy(dtype=np.float64, copy=False)
+    c = df['Close'].to_numpy(dtype=np.float64, copy=False)
+    v = df['Volume'].to_numpy(dtype=np.float64, copy=False)
+
+    # Shift by one candle so each position sees its previous candle
+    prev_o = np.roll(o, 1)
+    prev_c = np.roll(c, 1)
 
     # Check basic engulfing criteria for both types
-    previous_is_bearish = previous_candle['Close'] < previous_candle['Open']
-    current_is_bullish = current_candle['Close'] > current_candle['Open']
+    # Candle colours are compared once; the previous candle's colour is the same mask shifted
+    current_is_bullish = c > o
+    current_is_bearish = c < o
     
-    previous_is_bullish = previous_candle['Close'] > previous_candle['Open']
-    current_is_bearish = current_candle['Close'] < current_candle['Open']
+    previous_is_bullish = np.roll(current_is_bullish, 1)
+    previous_is_bearish = np.roll(current_is_bearish, 1)
     
-    body_size_p2 = abs(current_candle['Close'] - current_candle['Open'])
-    body_size_p1 = abs(previous_candle['Close'] - previous_candle['Open'])
+    body_size_p2 = np.abs(c - o)
+    body_size_p1 = np.abs(prev_c - prev_o)
     p2_body_larger = body_size_p2 > body_size_p1
 
-    # Check for Volume Confirmation
-    volume_period = 10
-    avg_volume = df['Volume'].iloc[index - volume_period:index].mean()
-    is_volume_confirmed = current_candle['Volume'] > avg_volume
+    # Check for Volume Confirmation (average of the previous candles)
+    # The rolling mean is updated incrementally; shifting by one keeps the current candle
+    # out of its own average, and the NaN warm-up entries never confirm a signal.
+    avg_volume = df['Volume'].rolling(window=volume_period).mean().shift(1).to_numpy()
+    is_volume_confirmed = v > avg_volume
 
     # Check for Trend Confirmation (using a simple moving average)
-    ma_period = 20
-    sma = talib.SMA(df['Close'], timeperiod=ma_period)
-    is_in_uptrend = current_candle['Close'] > sma.iloc[index]
-    is_in_downtrend = current_candle['Close'] < sma.iloc[index]
+    sma = rolling_mean(c, ma_period)
+    is_in_uptrend = c > sma
+    is_in_downtrend = c < sma
 
     # Bullish Engulfing Pattern
     # P1 is bearish, P2 is bullish, P2's body engulfs P1, P2 body is larger, volume is confirmed, and is in a downtrend.
-    bullish_engulfs = (current_candle['Close'] > previous_candle['Open']) and \
-                      (current_candle['Open'] < previous_candle['Close'])
+    bullish_engulfs = (c > prev_o) & (o < prev_c)
                       
-    is_bullish_pattern = previous_is_bearish and current_is_bullish and bullish_engulfs and p2_body_larger and is_volume_confirmed and is_in_downtrend
-    
-    if is_bullish_pattern:
-        return 'bullish'
+    is_bullish_pattern = np.logical_and.reduce([previous_is_bearish, bullish_engulfs,
+                                                p2_body_larger, is_volume_confirmed, is_in_downtrend])
 
     # Bearish Engulfing Pattern
     # P1 is bullish, P2 is bearish, P2's body engulfs P1, P2 body is larger, volume is confirmed, and is in an uptrend.
-    bearish_engulfs = (current_candle['Close'] < previous_candle['Open']) and \
-                      (current_candle['Open'] > previous_candle['Close'])
-    
-    is_bearish_pattern = previous_is_bullish and current_is_bearish and bearish_engulfs and p2_body_larger and is_volume_confirmed and is_in_uptrend
+    bearish_engulfs = (c < prev_o) & (o > prev_c)
     
-    if is_bearish_pattern:
-        return 'bearish'
+    is_bearish_pattern = np.logical_and.reduce([previous_is_bullish, bearish_engulfs,
+                                                p2_body_larger, is_volume_confirmed, is_in_uptrend])
+
+    # A candle is either bullish or bearish, so at most one code is written per candle
+    signal = np.full(len(c), NO_SIGNAL, dtype=np.int8)
+    signal[current_is_bullish & is_bullish_pattern] = BULLISH
+    signal[current_is_bearish & is_bearish_pattern] = BEARISH
+
+    # Not enough history for the indicators on the first candles
+    signal[:ma_period] = NO_SIGNAL
         
-    return None
+    return signal
 
 # --- Step 4: Integrate a Trading Strategy for both Long and Short Positions ---
 
-def simulated_trading_logic(df, initial_capital, risk_per_trade_pct, profit_target_pct):
+# Position types used inside the compiled simulation
+LONG = 1
+SHORT = -1
+
+def stop_loss_levels(h, l):
     """
-    Simulates a trading strategy for both long and short positions with risk management.
+    Precomputes the stop-loss price for a position opened on each candle.
     
     Args:
-        df (pd.DataFrame): The candlestick data.
+        h, l (np.ndarray): The High and Low prices.
+
+    Returns:
+        tuple: Two arrays (long, short): the lower of the current and previous lows, and
+               the higher of the current and previous highs.
+    """
+    previous_l = np.concatenate((l[:1], l[:-1]))
+    previous_h = np.concatenate((h[:1], h[:-1]))
+    return np.minimum(l, previous_l), np.maximum(h, previous_h)
+
+# Event codes recorded by the compiled simulation and printed afterwards
+BULLISH_DETECTED = 0
+BEARISH_DETECTED = 1
+LONG_OPENED = 2
+SHORT_OPENED = 3
+LONG_TAKE_PROFIT = 4
+LONG_STOP_LOSS = 5
+SHORT_TAKE_PROFIT = 6
+SHORT_STOP_LOSS = 7
+
+@njit(cache=True)
+def run_sim(h, l, c, sl_long, sl_short, signal, initial_capital, risk_per_trade_pct, profit_target_pct):
+    """
+    Runs the long/short take-profit and stop-loss state machine over raw price arrays.
+    While flat it jumps from one signal candle to the next; while in a position it scans
+    forward only until the exit candle.
+    
+    Args:
+        h, l, c (np.ndarray): The High, Low and Close prices.
+        sl_long, sl_short (np.ndarray): The stop-loss levels from stop_loss_levels.
+        signal (np.ndarray): The int8 signal array from check_engulfing_pattern.
         initial_capital (float): The starting capital.
-        risk_per_trade_pct (float): The percentage of capital to risk per trade (e.g., 0.01 for 1%).
+        risk_per_trade_pct (float): The percentage of capital to risk per trade.
         profit_target_pct (float): The percentage profit at which to exit a trade.
+
+    Returns:
+        tuple: The event log as a list of (index, event code, value1, value2, value3) tuples,
+               the final capital, and the type of a position still open at the end (0 if none).
+               Openings carry entry, stop-loss and take-profit prices; exits carry the new capital.
     """
+    events = []
+    n = len(c)
+
     capital = initial_capital
     position_open = False
-    position_type = None # 'long' or 'short'
-    
-    print(f"Starting simulation with an initial capital of ${capital:.2f}")
+    position_type = 0
 
-    for i in range(1, len(df)):
-        current_candle = df.iloc[i]
-        
-        if position_open:
-            if position_type == 'long':
-                # Check take-profit for a long position
-                if current_candle['High'] >= take_profit_price:
-                    capital += position_size * profit_target_pct
-                    position_open = False
-                    print(f"Time {df.index[i]}: LONG TAKE-PROFIT HIT! New capital: ${capital:.2f}")
-                
-                # Check stop-loss for a long position
-                elif current_candle['Low'] <= stop_loss_price:
-                    capital -= (entry_price - stop_loss_price) / entry_price * position_size
-                    position_open = False
-                    print(f"Time {df.index[i]}: LONG STOP-LOSS HIT! New capital: ${capital:.2f}")
+    # Only candles with a signal can open a position, so jump straight between them
+    signal_bars = np.flatnonzero(signal)
+    k = np.searchsorted(signal_bars, 1)
+
+    while k < len(signal_bars):
+        i = signal_bars[k]
+        k += 1
+
+        entry_price = c[i]
+        if signal[i] == BULLISH:
+            events.append((i, BULLISH_DETECTED, 0.0, 0.0, 0.0))
+            
+            # Stop-loss placement and sizing for long position
+            stop_loss_price = sl_long[i]
+            stop_loss_distance = entry_price - stop_loss_price
+            if stop_loss_distance <= 0:
+                continue
             
-            elif position_type == 'short':
-                # Check take-profit for a short position
-                if current_candle['Low'] <= take_profit_price:
-                    capital += (entry_price - take_profit_price) / entry_price * position_size
-                    position_open = False
-                    print(f"Time {df.index[i]}: SHORT TAKE-PROFIT HIT! New capital: ${capital:.2f}")
-                
-                # Check stop-loss for a short position
-                elif current_candle['High'] >= stop_loss_price:
-                    capital -= (stop_loss_price - entry_price) / entry_price * position_size
-                    position_open = False
-                    print(f"Time {df.index[i]}: SHORT STOP-LOSS HIT! New capital: ${capital:.2f}")
+            position_size = capital * risk_per_trade_pct / stop_loss_distance
+            take_profit_price = entry_price * (1 + profit_target_pct)
+            position_type = LONG
+            take_profit_pnl = position_size * profit_target_pct
+            stop_loss_pnl = -((entry_price - stop_loss_price) / entry_price * position_size)
+            events.append((i, LONG_OPENED, entry_price, stop_loss_price, take_profit_price))
+            take_profit_extremes, stop_loss_extremes = h, l
         
-        else: # No position is open
-            signal = check_engulfing_pattern(df, i)
+        else:
+            events.append((i, BEARISH_DETECTED, 0.0, 0.0, 0.0))
             
-            if signal == 'bullish':
-                print(f"Time {df.index[i]}: Valid BULLISH engulfing pattern detected!")
-                entry_price = current_candle['Close']
-                
-                # Stop-loss placement for long position
-                previous_candle = df.iloc[i-1]
-                stop_loss_price = min(current_candle['Low'], previous_candle['Low'])
-                
-                # Position Sizing
-                risk_amount = capital * risk_per_trade_pct
-                stop_loss_distance = entry_price - stop_loss_price
-                
-                if stop_loss_distance > 0:
-                    position_size = risk_amount / stop_loss_distance
-                    take_profit_price = entry_price * (1 + profit_target_pct)
-                    position_open = True
-                    position_type = 'long'
-                    print(f"Time {df.index[i]}: Opening LONG position. Entry: ${entry_price:.4f}, Stop-Loss: ${stop_loss_price:.4f}, Take-Profit: ${take_profit_price:.4f}")
+            # Stop-loss placement and sizing for short position
+            stop_loss_price = sl_short[i]
+            stop_loss_distance = stop_loss_price - entry_price
+            if stop_loss_distance <= 0:
+                continue
             
-            elif signal == 'bearish':
-                print(f"Time {df.index[i]}: Valid BEARISH engulfing pattern detected!")
-                entry_price = current_candle['Close']
-                
-                # Stop-loss placement for short position
-                previous_candle = df.iloc[i-1]
-                stop_loss_price = max(current_candle['High'], previous_candle['High'])
-                
-                # Position Sizing
-                risk_amount = capital * risk_per_trade_pct
-                stop_loss_distance = stop_loss_price - entry_price
-                
-                if stop_loss_distance > 0:
-                    position_size = risk_amount / stop_loss_distance
-                    take_profit_price = entry_price * (1 - profit_target_pct)
-                    position_open = True
-                    position_type = 'short'
-                    print(f"Time {df.index[i]}: Opening SHORT position. Entry: ${entry_price:.4f}, Stop-Loss: ${stop_loss_price:.4f}, Take-Profit: ${take_profit_price:.4f}")
-
-    if position_open:
-        print(f"Simulation ended with an open {position_type} position. For a real bot, this would be closed.")
+            position_size = capital * risk_per_trade_pct / stop_loss_distance
+            take_profit_price = entry_price * (1 - profit_target_pct)
+            position_type = SHORT
+            take_profit_pnl = (entry_price - take_profit_price) / entry_price * position_size
+            stop_loss_pnl = -((stop_loss_price - entry_price) / entry_price * position_size)
+            events.append((i, SHORT_OPENED, entry_price, stop_loss_price, take_profit_price))
+            take_profit_extremes, stop_loss_extremes = l, h
+
+        # Scan forward to the first candle that crosses either level. position_type is +1 (long)
+        # or -1 (short), so one signed comparison per level covers both directions. The scan stops
+        # at the exit, so the whole run still touches each candle only once.
+        exit_bar = -1
+        for j in range(i + 1, n):
+            if (position_type * (take_profit_extremes[j] - take_profit_price) >= 0 or
+                    position_type * (stop_loss_price - stop_loss_extremes[j]) >= 0):
+                exit_bar = j
+                break
+
+        if exit_bar < 0:
+            position_open = True
+            break
+
+        # Take-profit wins if both levels are crossed on the same candle
+        take_profit_hit = int(position_type * (take_profit_extremes[exit_bar] - take_profit_price) >= 0)
+        stop_loss_hit = 1 - take_profit_hit
+        capital += take_profit_hit * take_profit_pnl + stop_loss_hit * stop_loss_pnl
+
+        # Exit codes are ordered long TP, long SL, short TP, short SL
+        exit_event = LONG_TAKE_PROFIT + (1 - position_type) + stop_loss_hit
+        events.append((exit_bar, exit_event, capital, 0.0, 0.0))
+
+        # The exit candle itself is not checked for a new entry
+        k = np.searchsorted(signal_bars, exit_bar + 1)
+
+    return events, capital, position_type if position_open else 0
+
+def simulated_trading_logic(df, initial_capital, risk_per_trade_pct, profit_target_pct):
+    """
+    Simulates a trading strategy for both long and short positions with risk management.
+    
+    Args:
+        df (pd.DataFrame): The candlestick data.
+        initial_capital (float): The starting capital.
+        risk_per_trade_pct (float): The percentage of capital to risk per trade (e.g., 0.01 for 1%).
+        profit_target_pct (float): The percentage profit at which to exit a trade.
+    """
+    print(f"Starting simulation with an initial capital of ${initial_capital:.2f}")
+
+    signal = check_engulfing_pattern(df)
+
+    # Raw price arrays for the compiled simulation
+    h = df['High'].to_numpy(dtype=np.float64, copy=False)
+    l = df['Low'].to_numpy(dtype=np.float64, copy=False)
+    c = df['Close'].to_numpy(dtype=np.float64, copy=False)
+    sl_long, sl_short = stop_loss_levels(h, l)
+
+    events, capital, open_position_type = run_sim(h, l, c, sl_long, sl_short, signal,
+                                                  float(initial_capital), risk_per_trade_pct, profit_target_pct)
+
+    # Report the event log once the simulation is done; timestamps are only built for logged events
+    times = df.index.to_numpy()
+    for i, event, value1, value2, value3 in events:
+        timestamp = pd.Timestamp(times[i])
+        if event == BULLISH_DETECTED:
+            print(f"Time {timestamp}: Valid BULLISH engulfing pattern detected!")
+        elif event == BEARISH_DETECTED:
+            print(f"Time {timestamp}: Valid BEARISH engulfing pattern detected!")
+        elif event == LONG_OPENED:
+            print(f"Time {timestamp}: Opening LONG position. Entry: ${value1:.4f}, Stop-Loss: ${value2:.4f}, Take-Profit: ${value3:.4f}")
+        elif event == SHORT_OPENED:
+            print(f"Time {timestamp}: Opening SHORT position. Entry: ${value1:.4f}, Stop-Loss: ${value2:.4f}, Take-Profit: ${value3:.4f}")
+        elif event == LONG_TAKE_PROFIT:
+            print(f"Time {timestamp}: LONG TAKE-PROFIT HIT! New capital: ${value1:.2f}")
+        elif event == LONG_STOP_LOSS:
+            print(f"Time {timestamp}: LONG STOP-LOSS HIT! New capital: ${value1:.2f}")
+        elif event == SHORT_TAKE_PROFIT:
+            print(f"Time {timestamp}: SHORT TAKE-PROFIT HIT! New capital: ${value1:.2f}")
+        elif event == SHORT_STOP_LOSS:
+            print(f"Time {timestamp}: SHORT STOP-LOSS HIT! New capital: ${value1:.2f}")
+
+    if open_position_type != 0:
+        print(f"Simulation ended with an open {'long' if open_position_type == LONG else 'short'} position. For a real bot, this would be closed.")
         # Logic for closing the final position could be added here
     
     print(f"\nSimulation finished. Final capital: ${capital:.2f}")
 
+@njit(cache=True)
+def run_sweep(h, l, c, sl_long, sl_short, signal, initial_capital, risk_per_trade_pct, profit_target_pct):
+    """
+    Runs the same state machine as run_sim for many parameter combinations in one pass over
+    the candles. Every piece of position state is an array with one entry per combination,
+    and exits and entries are applied as masked updates.
+    
+    Args:
+        h, l, c (np.ndarray): The High, Low and Close prices.
+        sl_long, sl_short (np.ndarray): The stop-loss levels from stop_loss_levels.
+        signal (np.ndarray): The int8 signal array from check_engulfing_pattern.
+        initial_capital (float): The starting capital.
+        risk_per_trade_pct (np.ndarray): The risk percentage of each parameter combination.
+        profit_target_pct (np.ndarray): The profit target of each parameter combination.
+
+    Returns:
+        np.ndarray: The final capital of each parameter combination.
+    """
+    n_params = len(risk_per_trade_pct)
+    capital = np.full(n_params, initial_capital)
+    position_open = np.zeros(n_params, dtype=np.bool_)
+    position_type = np.zeros(n_params, dtype=np.int8)
+    entry_price = np.ones(n_params)
+    stop_loss_price = np.zeros(n_params)
+    take_profit_price = np.zeros(n_params)
+    position_size = np.zeros(n_params)
+
+    for i in range(1, len(c)):
+        is_long = position_open & (position_type == LONG)
+        is_short = position_open & (position_type == SHORT)
+
+        # Take-profit is checked before stop-loss, as in run_sim
+        long_tp = is_long & (h[i] >= take_profit_price)
+        long_sl = is_long & ~long_tp & (l[i] <= stop_loss_price)
+        short_tp = is_short & (l[i] <= take_profit_price)
+        short_sl = is_short & ~short_tp & (h[i] >= stop_loss_price)
+
+        capital += np.where(long_tp, position_size * profit_target_pct, 0.0)
+        capital -= np.where(long_sl, (entry_price - stop_loss_price) / entry_price * position_size, 0.0)
+        capital += np.where(short_tp, (entry_price - take_profit_price) / entry_price * position_size, 0.0)
+        capital -= np.where(short_sl, (stop_loss_price - entry_price) / entry_price * position_size, 0.0)
+
+        # Only combinations that were flat at the start of the candle look for an entry
+        opening = ~position_open
+        position_open = position_open & ~(long_tp | long_sl | short_tp | short_sl)
+
+        s = signal[i]
+        if s == BULLISH:
+            entry = c[i]
+            stop = sl_long[i]
+            stop_loss_distance = entry - stop
+            target = entry * (1 + profit_target_pct)
+            new_type = LONG
+        elif s == BEARISH:
+            entry = c[i]
+            stop = sl_short[i]
+            stop_loss_distance = stop - entry
+            target = entry * (1 - profit_target_pct)
+            new_type = SHORT
+        else:
+            continue
+
+        # The stop distance does not depend on the parameters, so it gates every combination
+        if stop_loss_distance > 0:
+            position_size[opening] = capital[opening] * risk_per_trade_pct[opening] / stop_loss_distance
+            take_profit_price[opening] = target[opening]
+            entry_price[opening] = entry
+            stop_loss_price[opening] = stop
+            position_type[opening] = new_type
+            position_open = position_open | opening
+
+    return capital
+
+def simulated_parameter_sweep(df, initial_capital, risk_grid, profit_target_grid):
+    """
+    Simulates the strategy for every combination of risk and profit-target percentages.
+    
+    Args:
+        df (pd.DataFrame): The candlestick data.
+        initial_capital (float): The starting capital.
+        risk_grid (list): The risk percentages per trade to try.
+        profit_target_grid (list): The profit-target percentages to try.
+
+    Returns:
+        pd.DataFrame: The final capital, indexed by risk percentage with one column per profit target.
+    """
+    signal = check_engulfing_pattern(df)
+
+    h = df['High'].to_numpy(dtype=np.float64, copy=False)
+    l = df['Low'].to_numpy(dtype=np.float64, copy=False)
+    c = df['Close'].to_numpy(dtype=np.float64, copy=False)
+    sl_long, sl_short = stop_loss_levels(h, l)
+
+    risk, target = np.meshgrid(np.asarray(risk_grid, dtype=np.float64),
+                               np.asarray(profit_target_grid, dtype=np.float64), indexing='ij')
+    capital = run_sweep(h, l, c, sl_long, sl_short, signal, float(initial_capital), risk.ravel(), target.ravel())
+
+    return pd.DataFrame(capital.reshape(risk.shape),
+                        index=pd.Index(risk_grid, name='risk_per_trade_pct'),
+                        columns=pd.Index(profit_target_grid, name='profit_target_pct'))
+
 # --- Step 5: Run the Simulation with Real Data ---
 if __name__ == "__main__":
     historical_data = get_historical_klines("POLUSDT", Client.KLINE_INTERVAL_1HOUR, "30 day ago UTC")